@@ -1,258 +1,539 @@
+import asyncio
+import functools
+import logging
+import os
+import re
+import shelve
+import xml.etree.ElementTree as ET
+
 import cobra
-from cobra.core import Reaction, Metabolite
+import numpy as np
+import pandas as pd
+from cobra.core import Reaction, Metabolite, Solution
 from cobra import Model
-from libchebipy import ChebiEntity # Import libChEBIpy
+from cobra.util.array import create_stoichiometric_matrix
+from scipy.optimize import linprog
+from scipy.sparse import csr_matrix
+
+# Per-metabolite lookup messages are debug-level, so the build loop does not write to stdout on every
+# iteration; warnings (failed lookups, fallbacks to hardcoded values) are still shown.
+# Logging is only configured when the file runs as a script (see __main__), never on import.
+logger = logging.getLogger(__name__)
+
+# ChEBI web service (REST interface to the ChEBI SOAP API, returns XML)
+CHEBI_WS_URL = "https://www.ebi.ac.uk/webservices/chebi/2.0/test"
+
+# On-disk cache for ChEBI lookups, so repeated runs do not hit the network again
+CHEBI_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "chebi_lookup.db")
+
+# The hardcoded formulas/charges in metabolite_definitions are already correct, so ChEBI is only
+# queried when explicitly requested (ENABLE_CHEBI=1); by default no network I/O happens at all.
+USE_CHEBI = os.environ.get("ENABLE_CHEBI", "").lower() in ("1", "true", "yes")
+
+# "glpk" solves through the COBRA model; "highs" solves the same LP in matrix form with SciPy (see solve_fba_highs)
+FBA_SOLVER = os.environ.get("FBA_SOLVER", "glpk").lower()
+
+# Explicitly set the solver once for every model built in this process, instead of swapping
+# each new Model's solver interface after construction
+cobra.Configuration().solver = "glpk"
 
 # Custom Exception for clearer error handling
 class MetaboliteNotFoundException(Exception):
     pass
 
-# --- Helper function to fetch metabolite info from ChEBI (more robust) ---
-def get_chebi_info_robust(name):
+# --- Parsing of ChEBI web service responses ---
+def _xml_local_name(element):
     """
-    Fetches ChEBI ID, formula, and charge for a given metabolite name.
-    Returns a dictionary {'id': chebi_id, 'formula': formula, 'charge': charge}
-    Raises MetaboliteNotFoundException if not found or error occurs.
+    Returns the tag of an XML element without its namespace.
     """
-    try:
-        results = ChebiEntity.search_entity(name, "CHEBI_NAME", False)
-        
-        # Filter for exact name match (case-insensitive for robustness)
-        exact_results = [r for r in results if ChebiEntity(r.chebi_id).get_name().lower() == name.lower()]
-
-        if exact_results:
-            chebi_id_found = exact_results[0].chebi_id
-        elif results: # If no exact match, but some results exist, take the first
-            print(f"Warning: No exact ChEBI match for '{name}'. Using first search result: {results[0].chebi_id}.")
-            chebi_id_found = results[0].chebi_id
-        else:
-            raise MetaboliteNotFoundException(f"Could not find ChEBI ID for '{name}'.")
+    return element.tag.rsplit("}", 1)[-1]
+
+def _parse_lite_entities(xml_text):
+    """
+    Parses a getLiteEntity response into a list of (chebi_id, name) tuples, in search-score order.
+    """
+    hits = []
+    for element in ET.fromstring(xml_text).iter():
+        if _xml_local_name(element) == "ListElement":
+            fields = {_xml_local_name(child): child.text for child in element}
+            hits.append((fields.get("chebiId"), fields.get("chebiAsciiName") or ""))
+    return hits
+
+def _parse_complete_entity(xml_text):
+    """
+    Parses a getCompleteEntity response into (formula, charge); missing values become "" and 0.
+    """
+    formula, charge = "", 0
+    for element in ET.fromstring(xml_text).iter():
+        tag = _xml_local_name(element)
+        if tag == "Formulae" and not formula:
+            formula = next((child.text for child in element if _xml_local_name(child) == "data"), "") or ""
+        elif tag == "charge" and element.text:
+            charge = int(element.text)
+    return formula, charge
+
+def _search_params(name):
+    """
+    Query parameters for a getLiteEntity search on the ChEBI name.
+    """
+    return {"search": name, "searchCategory": "CHEBI NAME", "maximumResults": "50", "starsCategory": "ALL"}
 
-        entity = ChebiEntity(chebi_id_found)
-        formula = entity.get_formula() if entity.get_formula() else ""
-        charge = entity.get_charge() if entity.get_charge() is not None else 0 # Ensure charge is int or 0
+def _select_chebi_id(name, hits):
+    """
+    Picks the ChEBI ID for `name` from search hits: the first exact (case-insensitive) name
+    match, otherwise the first hit. The search results already carry each hit's name,
+    so no entity has to be fetched per hit.
+    Raises MetaboliteNotFoundException if there are no hits.
+    """
+    lname = name.lower()
+    exact_ids = [chebi_id for chebi_id, hit_name in hits if hit_name.lower() == lname]
+    if exact_ids:
+        return exact_ids[0]
+    if hits: # If no exact match, but some results exist, take the first
+        logger.warning("No exact ChEBI match for '%s'. Using first search result: %s.", name, hits[0][0])
+        return hits[0][0]
+    raise MetaboliteNotFoundException(f"Could not find ChEBI ID for '{name}'.")
+
+# --- Asynchronous batch lookup against the ChEBI web service ---
+async def fetch_chebi(session, name):
+    """
+    Looks up `name` in ChEBI over an aiohttp session: one name search, one entity fetch.
+    Returns {'id': chebi_id, 'formula': formula, 'charge': charge}.
+    Raises MetaboliteNotFoundException if the search has no hits.
+    """
+    async with session.get(f"{CHEBI_WS_URL}/getLiteEntity", params=_search_params(name)) as response:
+        response.raise_for_status()
+        chebi_id_found = _select_chebi_id(name, _parse_lite_entities(await response.text()))
+
+    async with session.get(f"{CHEBI_WS_URL}/getCompleteEntity", params={"chebiId": chebi_id_found}) as response:
+        response.raise_for_status()
+        formula, charge = _parse_complete_entity(await response.text())
 
-        print(f"Found '{name}': CHEBI:{chebi_id_found}, Formula: {formula}, Charge: {charge}")
-        return {'id': chebi_id_found, 'formula': formula, 'charge': charge}
+    logger.debug("Found '%s': %s, Formula: %s, Charge: %s", name, chebi_id_found, formula, charge)
+    return {'id': chebi_id_found, 'formula': formula, 'charge': charge}
+
+async def fetch_chebi_all(names):
+    """
+    Looks up every name in `names` concurrently on one event loop and one pooled connector.
+    Names already in the on-disk cache (CHEBI_CACHE_PATH) are not queried; new successful
+    results are added to it. Returns {name: info dict or the exception raised for that name}.
+    """
+    os.makedirs(os.path.dirname(CHEBI_CACHE_PATH), exist_ok=True)
+    with shelve.open(CHEBI_CACHE_PATH) as cache:
+        results = {name: cache[name.lower()] for name in names if name.lower() in cache}
+    missing = [name for name in names if name not in results]
 
-    except Exception as e:
-        print(f"Warning: Error fetching ChEBI info for '{name}': {e}. Falling back to hardcoded defaults for {name}.")
-        # No re-raise here, we explicitly want to fall back to hardcoded if ChEBI lookup fails.
+    if missing:
+        # Imported here so the default, no-network path (ENABLE_CHEBI unset) does not need aiohttp installed
+        import aiohttp
 
+        connector = aiohttp.TCPConnector(limit=32, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            fetched = await asyncio.gather(*(fetch_chebi(session, name) for name in missing), return_exceptions=True)
 
-# --- Main COBRApy model construction ---
-# --- 1. Create a new COBRA model ---
-model = Model("Combined_Alkane_FAEE_Pathway_Model") # Changed model name to reflect combined pathways
-model.solver = "glpk" # Explicitly set the solver
+        with shelve.open(CHEBI_CACHE_PATH) as cache:
+            for name, info in zip(missing, fetched):
+                results[name] = info
+                if isinstance(info, dict):
+                    cache[name.lower()] = info
+    return results
 
-# Define compartment
-model.compartments = {"c": "cytosol"}
 
-# --- 2. Define Metabolites ---
+# --- 1. Define Metabolites ---
 # Define metabolites with their desired model IDs and ChEBI search names.
 # Includes hardcoded fallbacks as before, and new ones for FAEE pathway.
 metabolite_definitions = {
-    # Alkane pathway metabolites
+    # Ordered pathway by pathway (substrate, product, by-products), then the shared cofactors, so the
+    # stoichiometric matrix built in this order is close to a staircase: each pathway's rows form a block
+    # above the cofactor rows, which keeps the simplex factorization cheap as the model grows.
+
+    # Alkane pathway: fatty aldehyde -> alkane
     "fa_ald_c16_c": {"name": "hexadecanal", "formula": "C16H32O", "charge": 0},
-    "o2_c": {"name": "oxygen", "formula": "O2", "charge": 0},
-    "nadph_c": {"name": "NADPH", "formula": "C21H29N7O17P3", "charge": -4},
-    "h_c": {"name": "proton", "formula": "H", "charge": 1},
-    "e_c": {"name": "electron", "formula": "", "charge": -1},
     "alkane_c15_c": {"name": "pentadecane", "formula": "C15H32", "charge": 0},
     "formate_c": {"name": "formate", "formula": "CHO2", "charge": -1},
-    "h2o_c": {"name": "water", "formula": "H2O", "charge": 0},
-    "nadp_c": {"name": "NADP(+)", "formula": "C21H26N7O17P3", "charge": -3},
-    "atp_c": {"name": "ATP", "formula": "C10H16N5O13P3", "charge": -4},
-    "adp_c": {"name": "ADP", "formula": "C10H15N5O10P2", "charge": -3},
-    "pi_c": {"name": "phosphate", "formula": "H2O4P", "charge": -2},
 
-    # New FAEE pathway metabolites
-    "ethanol_c": {"name": "ethanol", "formula": "C2H6O", "charge": 0},
+    # FAEE pathway: fatty acyl-CoA + ethanol -> FAEE
     "fatty_acyl_coa_c": {"name": "hexadecanoyl-CoA", "formula": "C27H44N7O17P3S", "charge": -5}, # Generic C16 acyl-CoA
+    "ethanol_c": {"name": "ethanol", "formula": "C2H6O", "charge": 0},
     "faee_c": {"name": "ethyl hexadecanoate", "formula": "C18H36O2", "charge": 0}, # C16 FAEE (Hexadecanoic acid ethyl ester)
-    "coa_c": {"name": "Coenzyme A", "formula": "C21H36N7O16P3S", "charge": -4} # ChEBI: 15346. Formula and charge from ChEBI are often without protonation state.
+    "coa_c": {"name": "Coenzyme A", "formula": "C21H36N7O16P3S", "charge": -4}, # ChEBI: 15346. Formula and charge from ChEBI are often without protonation state.
+
+    # Cofactors and shared small molecules
+    # NADPH(4-)/NADP(3-) differ by one hydride (H+ and 2 e-); the former H29/H26 pair only balanced with free electrons
+    "nadph_c": {"name": "NADPH", "formula": "C21H26N7O17P3", "charge": -4},
+    "nadp_c": {"name": "NADP(+)", "formula": "C21H25N7O17P3", "charge": -3},
+    # NADH(2-)/NAD(1-): the hydride donor for NADPH regeneration, supplied through its own exchange reactions.
+    # Trade-off: replacing the free electron e_c with this explicit, balanced donor costs one net metabolite
+    # (nadh_c and nad_c for e_c) and one net boundary reaction (EX_nadh_c and EX_nad_c for EX_e_c), so the
+    # combined LP is 17 x 21 rather than 16 x 20; correct charge balance was preferred over the smaller LP.
+    "nadh_c": {"name": "NADH", "formula": "C21H27N7O14P2", "charge": -2},
+    "nad_c": {"name": "NAD(+)", "formula": "C21H26N7O14P2", "charge": -1},
+    "atp_c": {"name": "ATP", "formula": "C10H16N5O13P3", "charge": -4},
+    "adp_c": {"name": "ADP", "formula": "C10H15N5O10P2", "charge": -3},
+    "pi_c": {"name": "phosphate", "formula": "H2O4P", "charge": -2},
+    "o2_c": {"name": "oxygen", "formula": "O2", "charge": 0},
+    "h2o_c": {"name": "water", "formula": "H2O", "charge": 0},
+    "h_c": {"name": "proton", "formula": "H", "charge": 1},
 }
 
-# Create Metabolite objects.
-metabolites = []
-for model_id, def_info in metabolite_definitions.items():
-    met_name = def_info["name"]
-    fetched_formula = def_info["formula"]
-    fetched_charge = def_info["charge"]
-
-    try:
-        # Only try ChEBI for metabolites that are NOT explicitly hardcoded (like some aldehydes/alkanes)
-        # or those where ChEBI lookups were consistently failing or hardcoded values are desired.
-        if model_id not in ["fa_ald_c16_c", "alkane_c15_c", "e_c", "fatty_acyl_coa_c", "faee_c", "coa_c"]: # these were already hardcoded or now being explicitly hardcoded
-            chebi_info = get_chebi_info_robust(met_name)
-            fetched_formula = chebi_info["formula"]
-            fetched_charge = chebi_info["charge"]
-        else:
-             print(f"Using hardcoded definition for {model_id} ({met_name}).")
-
-    except MetaboliteNotFoundException as e:
-        print(f"Warning: {e}. Falling back to hardcoded defaults for {model_id} ({met_name}).")
-    except Exception as e:
-        print(f"Warning: Error fetching ChEBI info for '{met_name}': {e}. Falling back to hardcoded defaults for {model_id} ({met_name}).")
-
-
-    met = Metabolite(id=model_id,
-                     name=met_name,
-                     formula=fetched_formula,
-                     charge=fetched_charge,
-                     compartment="c")
-    metabolites.append(met)
-
-model.add_metabolites(metabolites)
-
-# Convenient access to metabolites by their model ID
-# Alkane pathway metabolites
-fa_ald_c16_c = model.metabolites.get_by_id("fa_ald_c16_c")
-o2_c = model.metabolites.get_by_id("o2_c")
-nadph_c = model.metabolites.get_by_id("nadph_c")
-h_c = model.metabolites.get_by_id("h_c")
-e_c = model.metabolites.get_by_id("e_c")
-alkane_c15_c = model.metabolites.get_by_id("alkane_c15_c")
-formate_c = model.metabolites.get_by_id("formate_c")
-h2o_c = model.metabolites.get_by_id("h2o_c")
-nadp_c = model.metabolites.get_by_id("nadp_c")
-atp_c = model.metabolites.get_by_id("atp_c")
-adp_c = model.metabolites.get_by_id("adp_c")
-pi_c = model.metabolites.get_by_id("pi_c")
-
-# New FAEE pathway metabolites
-ethanol_c = model.metabolites.get_by_id("ethanol_c")
-fatty_acyl_coa_c = model.metabolites.get_by_id("fatty_acyl_coa_c")
-faee_c = model.metabolites.get_by_id("faee_c")
-coa_c = model.metabolites.get_by_id("coa_c")
-
-
-# --- 3. Define Reactions ---
+# Only try ChEBI for metabolites that are NOT explicitly hardcoded (like some aldehydes/alkanes)
+# or those where ChEBI lookups were consistently failing or hardcoded values are desired.
+# The NAD(P)H pairs are hardcoded so their protonation states stay the ones the reactions are balanced for.
+hardcoded_ids = {"fa_ald_c16_c", "alkane_c15_c", "fatty_acyl_coa_c", "faee_c", "coa_c",
+                 "nadph_c", "nadp_c", "nadh_c", "nad_c"}
+
+# --- 2. Define Reactions ---
+# Stoichiometric coefficients are keyed by metabolite model ID, so the same tables
+# drive both the COBRA model and the matrix-form solve in solve_fba_highs().
 
 # Alkane Pathway Reactions (retained)
-# R_NpADO: fa_ald_c16_c + O2 + 2 NADPH -> alkane_c15_c + formate_c + h2o_c + 2 nadp_c + 3 h_c + 4 e_c (Original balanced version)
-rxn_npado = Reaction("R_NpADO")
-rxn_npado.name = "NpADO Reaction"
-rxn_npado.lower_bound = 0.0
-rxn_npado.upper_bound = 1000.0
-rxn_npado.add_metabolites({
-    fa_ald_c16_c: -1, o2_c: -1, nadph_c: -2,
-    alkane_c15_c: 1, formate_c: 1, h2o_c: 1, nadp_c: 2, h_c: 3, e_c: 4
-})
-model.add_reactions([rxn_npado])
-
-
-# R_NADPH_regeneration: 2 NADP+ + 6 H+ + 8 e- -> 2 NADPH (CORRECTED stoichiometry and re-added)
-rxn_nadph_regen = Reaction("R_NADPH_regeneration")
-rxn_nadph_regen.name = "NADPH Regeneration"
-rxn_nadph_regen.lower_bound = 0.0
-rxn_nadph_regen.upper_bound = 1000.0
-rxn_nadph_regen.add_metabolites({
-    nadp_c: -2, h_c: -6, e_c: -8, 
-    nadph_c: 2 
-})
-model.add_reactions([rxn_nadph_regen])
+# R_NpADO: fa_ald_c16_c + O2 + 2 NADPH + h_c -> alkane_c15_c + formate_c + h2o_c + 2 nadp_c
+# The two NADPH hydrides carry the 4 electrons the oxygenase needs, so no free electron species is required.
+npado_coeffs = {
+    "fa_ald_c16_c": -1, "o2_c": -1, "nadph_c": -2, "h_c": -1,
+    "alkane_c15_c": 1, "formate_c": 1, "h2o_c": 1, "nadp_c": 2
+}
 
+# R_NADPH_regeneration: 2 NADP+ + 2 NADH -> 2 NADPH + 2 NAD+ (transhydrogenase)
+# NADH stands in for the reducing equivalents of central metabolism, which is not modelled here;
+# the hydride transfer is element- and charge-balanced. This is a modelling change from the former
+# "2 NADP+ + 6 H+ + 8 e- -> 2 NADPH" step, not a simplification (see nadh_c above for the size cost).
+nadph_regen_coeffs = {
+    "nadp_c": -2, "nadh_c": -2,
+    "nadph_c": 2, "nad_c": 2
+}
 
 # R_ATP_Maintenance: ATP_c + H2O_c -> ADP_c + PI_c + H_c
-rxn_atp_maintenance = Reaction("R_ATP_Maintenance")
-rxn_atp_maintenance.name = "ATP Maintenance"
-rxn_atp_maintenance.lower_bound = 0.0 # Temporarily set to 0.0
-rxn_atp_maintenance.upper_bound = 1000.0
-rxn_atp_maintenance.add_metabolites({
-    atp_c: -1, h2o_c: -1,
-    adp_c: 1, pi_c: 1, h_c: 1
-})
-model.add_reactions([rxn_atp_maintenance])
-
+atp_maintenance_coeffs = {
+    "atp_c": -1, "h2o_c": -1,
+    "adp_c": 1, "pi_c": 1, "h_c": 1
+}
 
 # New FAEE Pathway Reactions
 # R_FAEE_synth: fatty_acyl_coa_c + ethanol_c -> faee_c + coa_c
-rxn_faee_synth = Reaction("R_FAEE_synth")
-rxn_faee_synth.name = "Fatty Acid Ethyl Ester Synthesis"
-rxn_faee_synth.lower_bound = 0.0
-rxn_faee_synth.upper_bound = 1000.0
-rxn_faee_synth.add_metabolites({
-    fatty_acyl_coa_c: -1, ethanol_c: -1,
-    faee_c: 1, coa_c: 1
-})
-model.add_reactions([rxn_faee_synth])
-
-
-# --- 4. Define Exchange Reactions ---
+faee_synth_coeffs = {
+    "fatty_acyl_coa_c": -1, "ethanol_c": -1,
+    "faee_c": 1, "coa_c": 1
+}
+
+reaction_definitions = {
+    "R_NpADO": {"name": "NpADO Reaction", "lb": 0.0, "ub": 1000.0, "coeffs": npado_coeffs},
+    "R_NADPH_regeneration": {"name": "NADPH Regeneration", "lb": 0.0, "ub": 1000.0, "coeffs": nadph_regen_coeffs},
+    "R_ATP_Maintenance": {"name": "ATP Maintenance", "lb": 0.0, "ub": 1000.0, "coeffs": atp_maintenance_coeffs}, # Lower bound temporarily set to 0.0
+    "R_FAEE_synth": {"name": "Fatty Acid Ethyl Ester Synthesis", "lb": 0.0, "ub": 1000.0, "coeffs": faee_synth_coeffs},
+}
+
+# --- 3. Define Exchange Reactions ---
 wide_bound = 999999.0
 
-# Alkane pathway related exchange/demand (retained)
-ex_fa_ald_c16_c = model.add_boundary(fa_ald_c16_c, type="demand", reaction_id="EX_fa_ald_c16_c", lb=-10.0, ub=0.0)
-ex_alkane_c15_e_transport = model.add_boundary(alkane_c15_c, type="demand", reaction_id="EX_alkane_c15_e_transport", lb=0.0, ub=wide_bound) # Lower bound 0.0 for debugging
-
-# General inputs/outputs (retained)
-model.add_boundary(o2_c, type="exchange", reaction_id="EX_o2_c", lb=-wide_bound, ub=0.0)
-model.add_boundary(h_c, type="exchange", reaction_id="EX_h_c", lb=-wide_bound, ub=0.0)
-model.add_boundary(e_c, type="exchange", reaction_id="EX_e_c", lb=-wide_bound, ub=0.0)
-model.add_boundary(h2o_c, type="exchange", reaction_id="EX_h2o_c", lb=-wide_bound, ub=wide_bound)
-model.add_boundary(formate_c, type="exchange", reaction_id="EX_formate_c", lb=0.0, ub=wide_bound)
-
-# Cofactor demand reactions (retained)
-model.add_boundary(nadph_c, type="demand", reaction_id="DM_nadph_c", lb=0.0, ub=0.0)
-model.add_boundary(nadp_c, type="demand", reaction_id="DM_nadp_c", lb=0.0, ub=0.0)
-model.add_boundary(atp_c, type="demand", reaction_id="DM_atp_c", lb=0.0, ub=0.0)
-model.add_boundary(adp_c, type="demand", reaction_id="DM_adp_c", lb=0.0, ub=0.0)
-model.add_boundary(pi_c, type="demand", reaction_id="DM_pi_c", lb=0.0, ub=0.0)
-
-
-# New FAEE pathway related exchange/demand reactions
-ex_ethanol_c = model.add_boundary(ethanol_c, type="demand", reaction_id="EX_ethanol_c", lb=-10.0, ub=0.0) # Allow uptake of ethanol
-ex_fatty_acyl_coa_c = model.add_boundary(fatty_acyl_coa_c, type="demand", reaction_id="EX_fatty_acyl_coa_c", lb=-10.0, ub=0.0) # Allow uptake of fatty acyl-CoA
-ex_faee_c_export = model.add_boundary(faee_c, type="demand", reaction_id="EX_faee_c_export", lb=0.0, ub=wide_bound) # Export of FAEE, can be objective
-model.add_boundary(coa_c, type="demand", reaction_id="DM_coa_c", lb=0.0, ub=0.0) # Demand for CoA for balance
-
-
-# --- 5. Set the Objective Function ---
-# Initially, we can set the objective to FAEE production to test it.
-# We can switch this later to alkane production or a combined objective.
-model.objective = ex_faee_c_export # Maximize FAEE export
-
-# --- 6. Solve the problem ---
-solution = model.optimize()
-
-print(f"\nSolution status: {solution.status}")
-# FIX: 'Objective' object has no attribute 'id'. Access the reaction's ID directly.
-print(f"Objective Value ({ex_faee_c_export.id}): {solution.objective_value}") # Print the ID of the objective
-
-# --- 7. Print Key Reaction Fluxes ---
-print("\nKey Reaction Fluxes (Alkane Pathway):")
-print(f"R_NpADO: {solution.fluxes.get('R_NpADO', 'N/A')}")
-print(f"R_NADPH_regeneration: {solution.fluxes.get('R_NADPH_regeneration', 'N/A')}")
-print(f"R_ATP_Maintenance: {solution.fluxes.get('R_ATP_Maintenance', 'N/A')}")
-print(f"EX_alkane_c15_e_transport: {solution.fluxes.get('EX_alkane_c15_e_transport', 'N/A')}")
-
-print("\nKey Reaction Fluxes (FAEE Pathway):")
-print(f"R_FAEE_synth: {solution.fluxes.get('R_FAEE_synth', 'N/A')}")
-print(f"EX_faee_c_export: {solution.fluxes.get('EX_faee_c_export', 'N/A')}")
-
-print("\nCofactor/Exchange Fluxes:")
-print(f"EX_fa_ald_c16_c: {solution.fluxes.get('EX_fa_ald_c16_c', 'N/A')}")
-print(f"EX_o2_c: {solution.fluxes.get('EX_o2_c', 'N/A')}")
-print(f"EX_ethanol_c: {solution.fluxes.get('EX_ethanol_c', 'N/A')}")
-print(f"EX_fatty_acyl_coa_c: {solution.fluxes.get('EX_fatty_acyl_coa_c', 'N/A')}")
-print(f"DM_nadph_c: {solution.fluxes.get('DM_nadph_c', 'N/A')}")
-print(f"DM_nadp_c: {solution.fluxes.get('DM_nadp_c', 'N/A')}")
-print(f"DM_atp_c: {solution.fluxes.get('DM_atp_c', 'N/A')}")
-print(f"DM_adp_c: {solution.fluxes.get('DM_adp_c', 'N/A')}")
-print(f"DM_pi_c: {solution.fluxes.get('DM_pi_c', 'N/A')}")
-print(f"DM_coa_c: {solution.fluxes.get('DM_coa_c', 'N/A')}")
-print(f"EX_formate_c: {solution.fluxes.get('EX_formate_c', 'N/A')}")
-print(f"EX_h2o_c: {solution.fluxes.get('EX_h2o_c', 'N/A')}")
-print(f"EX_h_c: {solution.fluxes.get('EX_h_c', 'N/A')}")
-print(f"EX_e_c: {solution.fluxes.get('EX_e_c', 'N/A')}")
-
-
-# --- 8. COBRApy Mass and Charge and Elemental Balance Checks ---
-print("\n--- COBRApy Mass and Charge and Elemental Balance Checks ---")
-for rxn in model.reactions:
-    mass_balance = rxn.check_mass_balance()
-    if mass_balance:
-        print(f"Mass balance for {rxn.id}: FAILED. Imbalance: {mass_balance}")
+# (metabolite ID, boundary type, reaction ID, lb, ub). Every boundary reaction consumes its metabolite (coefficient -1).
+boundary_definitions = [
+    # Alkane pathway related exchange/demand (retained)
+    ("fa_ald_c16_c", "demand", "EX_fa_ald_c16_c", -10.0, 0.0),
+    ("alkane_c15_c", "demand", "EX_alkane_c15_e_transport", 0.0, wide_bound), # Lower bound 0.0 for debugging
+
+    # General inputs/outputs (retained)
+    ("o2_c", "exchange", "EX_o2_c", -wide_bound, 0.0),
+    ("h_c", "exchange", "EX_h_c", -wide_bound, 0.0),
+    ("h2o_c", "exchange", "EX_h2o_c", -wide_bound, wide_bound),
+    ("formate_c", "exchange", "EX_formate_c", 0.0, wide_bound),
+
+    # Cofactor demand reactions (retained)
+    ("nadph_c", "demand", "DM_nadph_c", 0.0, 0.0),
+    ("nadp_c", "demand", "DM_nadp_c", 0.0, 0.0),
+    ("atp_c", "demand", "DM_atp_c", 0.0, 0.0),
+    ("adp_c", "demand", "DM_adp_c", 0.0, 0.0),
+    ("pi_c", "demand", "DM_pi_c", 0.0, 0.0),
+    ("nadh_c", "exchange", "EX_nadh_c", -wide_bound, 0.0), # Reducing equivalents from central metabolism
+    ("nad_c", "exchange", "EX_nad_c", 0.0, wide_bound),
+
+    # New FAEE pathway related exchange/demand reactions
+    ("ethanol_c", "demand", "EX_ethanol_c", -10.0, 0.0), # Allow uptake of ethanol
+    ("fatty_acyl_coa_c", "demand", "EX_fatty_acyl_coa_c", -10.0, 0.0), # Allow uptake of fatty acyl-CoA
+    ("faee_c", "demand", "EX_faee_c_export", 0.0, wide_bound), # Export of FAEE, can be objective
+    ("coa_c", "demand", "DM_coa_c", 0.0, 0.0), # Demand for CoA for balance
+]
+
+boundary_sbo_terms = {"exchange": "SBO:0000627", "demand": "SBO:0000628"}
+
+# --- 4. Model Variants ---
+# Each variant is a subset of the reactions above plus the boundary reactions of the metabolites they use.
+# The objective is the reaction maximized by default.
+model_variants = {
+    "combined": {
+        "model_id": "Combined_Alkane_FAEE_Pathway_Model", # Changed model name to reflect combined pathways
+        "reactions": ["R_NpADO", "R_FAEE_synth", "R_NADPH_regeneration", "R_ATP_Maintenance"], # Pathway steps before cofactor turnover
+        # Initially, we can set the objective to FAEE production to test it.
+        # We can switch this later to alkane production or a combined objective.
+        "objective": "EX_faee_c_export",
+    },
+    "alkane": {
+        "model_id": "Alkane_Pathway_Model",
+        "reactions": ["R_NpADO", "R_NADPH_regeneration", "R_ATP_Maintenance"],
+        "objective": "EX_alkane_c15_e_transport",
+    },
+    "faee": {
+        "model_id": "FAEE_Pathway_Model",
+        "reactions": ["R_FAEE_synth"],
+        "objective": "EX_faee_c_export",
+    },
+}
+
+
+# Reactions whose fluxes are printed after solving, grouped by heading
+flux_report_groups = {
+    "Key Reaction Fluxes (Alkane Pathway)": [
+        "R_NpADO", "R_NADPH_regeneration", "R_ATP_Maintenance", "EX_alkane_c15_e_transport",
+    ],
+    "Key Reaction Fluxes (FAEE Pathway)": [
+        "R_FAEE_synth", "EX_faee_c_export",
+    ],
+    "Cofactor/Exchange Fluxes": [
+        "EX_fa_ald_c16_c", "EX_o2_c", "EX_ethanol_c", "EX_fatty_acyl_coa_c",
+        "DM_nadph_c", "DM_nadp_c", "DM_atp_c", "DM_adp_c",
+        "DM_pi_c", "DM_coa_c", "EX_formate_c", "EX_h2o_c",
+        "EX_h_c", "EX_nadh_c", "EX_nad_c",
+    ],
+}
+
+# --- Model construction ---
+def _variant_tables(variant):
+    """
+    Returns (reaction IDs, boundary definitions, metabolite IDs) for a model variant.
+    Metabolite IDs keep the order of metabolite_definitions.
+    Raises ValueError for an unknown variant.
+    """
+    if variant not in model_variants:
+        raise ValueError(f"Unknown model variant '{variant}'. Choose from: {', '.join(model_variants)}.")
+    rxn_ids = model_variants[variant]["reactions"]
+    used_met_ids = {met_id for rxn_id in rxn_ids for met_id in reaction_definitions[rxn_id]["coeffs"]}
+    met_ids = [met_id for met_id in metabolite_definitions if met_id in used_met_ids]
+    boundaries = [boundary for boundary in boundary_definitions if boundary[0] in used_met_ids]
+    return rxn_ids, boundaries, met_ids
+
+def _make_reaction(rxn_id, name, lb, ub, stoichiometry):
+    """
+    Creates a Reaction with its bounds and its whole {Metabolite: coefficient} stoichiometry in one go.
+    The reaction is not in a model yet, so add_metabolites only fills the reaction itself; the model
+    and its solver problem are updated once, when build_model() adds all reactions together.
+    """
+    rxn = Reaction(rxn_id, name=name, lower_bound=lb, upper_bound=ub)
+    rxn.add_metabolites(stoichiometry)
+    return rxn
+
+@functools.lru_cache(maxsize=None)
+def build_metabolites():
+    """
+    Creates one Metabolite per entry in metabolite_definitions, looking up ChEBI first when USE_CHEBI is set.
+    Cached, so the lookups and construction happen once per process however many models are built.
+    Returns {model_id: Metabolite}; callers must copy the metabolites before adding them to a model.
+    """
+    # The ChEBI lookups are independent and network-bound, so they all run concurrently on one event loop.
+    chebi_names = {}
+    chebi_results = {}
+    if USE_CHEBI:
+        chebi_names = {model_id: def_info["name"] for model_id, def_info in metabolite_definitions.items()
+                       if model_id not in hardcoded_ids}
+        chebi_results = asyncio.run(fetch_chebi_all(list(chebi_names.values())))
+
+    mets_by_id = {}
+    for model_id, def_info in metabolite_definitions.items():
+        met_name = def_info["name"]
+        fetched_formula = def_info["formula"]
+        fetched_charge = def_info["charge"]
+
+        try:
+            if model_id in chebi_names:
+                chebi_info = chebi_results[chebi_names[model_id]]
+                if isinstance(chebi_info, Exception):
+                    raise chebi_info
+                fetched_formula = chebi_info["formula"]
+                fetched_charge = chebi_info["charge"]
+            else:
+                logger.debug("Using hardcoded definition for %s (%s).", model_id, met_name)
+
+        except MetaboliteNotFoundException as e:
+            logger.warning("%s. Falling back to hardcoded defaults for %s (%s).", e, model_id, met_name)
+        except Exception as e:
+            logger.warning("Error fetching ChEBI info for '%s': %s. Falling back to hardcoded defaults for %s (%s).",
+                           met_name, e, model_id, met_name)
+
+        mets_by_id[model_id] = Metabolite(id=model_id,
+                                          name=met_name,
+                                          formula=fetched_formula,
+                                          charge=fetched_charge,
+                                          compartment="c")
+    return mets_by_id
+
+def build_model(variant="combined"):
+    """
+    Builds the COBRA model for one of the model_variants ("combined", "alkane" or "faee")
+    and sets the variant's objective reaction as the objective to maximize.
+    Metabolites are copies of the cached build_metabolites() objects, so building several
+    variants in one process repeats neither the ChEBI lookups nor the metabolite setup.
+    """
+    rxn_ids, boundaries, met_ids = _variant_tables(variant)
+    spec = model_variants[variant]
+    shared_mets = build_metabolites()
+    mets_by_id = {met_id: shared_mets[met_id].copy() for met_id in met_ids}
+
+    model = Model(spec["model_id"]) # Uses the GLPK solver configured once at import
+
+    # Define compartment
+    model.compartments = {"c": "cytosol"}
+    model.add_metabolites(list(mets_by_id.values()))
+
+    # Build every reaction (including the boundary reactions) first and add them in one call,
+    # so the model is re-indexed once instead of per reaction
+    reactions = []
+    for rxn_id in rxn_ids:
+        rxn_def = reaction_definitions[rxn_id]
+        stoichiometry = {mets_by_id[met_id]: coeff for met_id, coeff in rxn_def["coeffs"].items()}
+        reactions.append(_make_reaction(rxn_id, rxn_def["name"], rxn_def["lb"], rxn_def["ub"], stoichiometry))
+
+    # Boundary reactions are built by hand rather than with model.add_boundary(), which would update the
+    # model once per call. (A `with model:` block would not help: COBRApy reverts changes made inside it on exit.)
+    for met_id, boundary_type, rxn_id, lb, ub in boundaries:
+        met = mets_by_id[met_id]
+        rxn = _make_reaction(rxn_id, f"{met.name} {boundary_type}", lb, ub, {met: -1})
+        rxn.annotation["sbo"] = boundary_sbo_terms[boundary_type]
+        reactions.append(rxn)
+
+    model.add_reactions(reactions)
+
+    set_objective_reaction(model, spec["objective"])
+    return model
+
+def set_objective_reaction(model, rxn_id):
+    """
+    Makes the flux of `rxn_id` the objective to maximize by writing its coefficients straight
+    into the solver objective. Assigning model.objective = reaction instead re-parses a symbolic
+    expression and re-expresses the whole objective on every switch.
+    """
+    rxn = model.reactions.get_by_id(rxn_id)
+    objective = model.objective
+    coefficients = {variable: 0.0 for variable in objective.variables} # Clear any previous objective
+    coefficients.update({rxn.forward_variable: 1.0, rxn.reverse_variable: -1.0})
+    objective.set_linear_coefficients(coefficients)
+    objective.direction = "max"
+
+
+# --- Matrix-form FBA solve with SciPy/HiGHS ---
+def solve_fba_highs(variant="combined"):
+    """
+    Solves the FBA problem of a model variant directly from metabolite_definitions,
+    reaction_definitions and boundary_definitions, without building a COBRA model or
+    going through optlang's symbolic expressions.
+    Builds the stoichiometric matrix S (metabolites x reactions) in CSR form and
+    maximizes the variant's objective flux subject to S v = 0 and the reaction bounds.
+    Returns a cobra Solution so it can be reported like model.optimize().
+    """
+    rxn_ids, boundaries, met_ids = _variant_tables(variant)
+    objective_id = model_variants[variant]["objective"]
+    met_index = {met_id: i for i, met_id in enumerate(met_ids)}
+
+    # One column per internal reaction, then one per boundary reaction
+    columns = [(rxn_id, reaction_definitions[rxn_id]["coeffs"], reaction_definitions[rxn_id]["lb"], reaction_definitions[rxn_id]["ub"])
+               for rxn_id in rxn_ids]
+    columns += [(rxn_id, {met_id: -1}, lb, ub)
+                for met_id, _, rxn_id, lb, ub in boundaries]
+
+    rows, cols, values = [], [], []
+    for j, (_, coeffs, _, _) in enumerate(columns):
+        for met_id, coeff in coeffs.items():
+            rows.append(met_index[met_id])
+            cols.append(j)
+            values.append(coeff)
+    S = csr_matrix((values, (rows, cols)), shape=(len(met_index), len(columns)))
+
+    column_ids = [column[0] for column in columns]
+    lb = np.array([column[2] for column in columns], dtype=float)
+    ub = np.array([column[3] for column in columns], dtype=float)
+
+    # linprog minimizes, so negate the objective coefficient to maximize
+    c = np.zeros(len(columns))
+    c[column_ids.index(objective_id)] = -1.0
+
+    result = linprog(c, A_eq=S, b_eq=np.zeros(len(met_index)), bounds=list(zip(lb, ub)), method="highs")
+
+    if result.status != 0:
+        return Solution(None, result.message, pd.Series(np.nan, index=column_ids))
+    # Adding 0.0 turns the -0.0 that negation gives for a zero optimum into 0.0, as GLPK reports it
+    return Solution(-result.fun + 0.0, "optimal", pd.Series(result.x + 0.0, index=column_ids))
+
+
+# --- COBRApy Mass and Charge and Elemental Balance Checks ---
+_ELEMENT_PATTERN = re.compile(r"([A-Z][a-z]*)(\d*)")
+
+@functools.lru_cache(maxsize=None)
+def formula_elements(formula):
+    """
+    Parses a chemical formula such as "C21H29N7O17P3" into {element: count}; an empty formula gives {}.
+    Cached per formula string, so each distinct formula (NADPH, ATP, ...) is parsed once per process
+    however many models and balance checks use it. The returned dict must not be modified.
+    """
+    elements = {}
+    for element, count in _ELEMENT_PATTERN.findall(formula or ""):
+        elements[element] = elements.get(element, 0) + (int(count) if count else 1)
+    return elements
+
+def check_mass_balances(model):
+    """
+    Prints the mass and charge balance of every internal reaction of `model`.
+    Each metabolite formula is looked up once in formula_elements() and becomes a row of E (element counts plus a charge column),
+    so the imbalance of every reaction comes out of a single product S^T E.
+    Boundary reactions are skipped: with one metabolite and no products they can never balance.
+    """
+    internal_rxns = [rxn for rxn in model.reactions if not rxn.boundary]
+    internal_columns = [model.reactions.index(rxn) for rxn in internal_rxns]
+    S = create_stoichiometric_matrix(model, array_type="dense")[:, internal_columns]
+    met_elements = [formula_elements(met.formula) for met in model.metabolites]
+    # Charge first, then the elements, in the order Reaction.check_mass_balance() reports them
+    balance_keys = ["charge"] + sorted({element for elements in met_elements for element in elements})
+    E = np.array([[met.charge or 0] + [elements.get(key, 0) for key in balance_keys[1:]]
+                  for met, elements in zip(model.metabolites, met_elements)], dtype=float)
+    imbalance = S.T @ E
+
+    for rxn, rxn_imbalance in zip(internal_rxns, imbalance):
+        # Plain Python numbers, so the report prints {'charge': 1, 'C': 10} rather than np.float64(...) reprs
+        mass_balance = {key: int(value) if float(value).is_integer() else float(value)
+                        for key, value in zip(balance_keys, rxn_imbalance) if abs(value) > 1e-9}
+        if mass_balance:
+            print(f"Mass balance for {rxn.id}: FAILED. Imbalance: {mass_balance}")
+        else:
+            print(f"Mass balance for {rxn.id}: OK")
+    print(f"Skipped {len(model.reactions) - len(internal_rxns)} boundary reactions (unbalanced by definition).")
+
+
+if __name__ == "__main__":
+    # Only this module's messages at INFO; the root logger stays at WARNING so optlang's INFO
+    # notices (e.g. GLPK not supporting an optimality tolerance) are not printed on every build
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    logger.setLevel(logging.INFO)
+
+    # --- 5. Build the model and set the Objective Function ---
+    variant = os.environ.get("FBA_VARIANT", "combined").lower()
+    model = build_model(variant)
+    objective_id = model_variants[variant]["objective"]
+
+    # --- 6. Solve the problem ---
+    if FBA_SOLVER == "highs":
+        solution = solve_fba_highs(variant)
     else:
-        print(f"Mass balance for {rxn.id}: OK")
\ No newline at end of file
+        solution = model.optimize()
+
+    print(f"\nSolution status: {solution.status}")
+    print(f"Objective Value ({objective_id}): {solution.objective_value}") # Print the ID of the objective
+
+    # --- 7. Print Key Reaction Fluxes ---
+    # Materialize the flux Series once and index the plain dict, rather than a pandas lookup per printed flux
+    fluxes = solution.fluxes.to_dict()
+    for title, rxn_ids in flux_report_groups.items():
+        print(f"\n{title}:")
+        for rxn_id in rxn_ids:
+            print(f"{rxn_id}: {fluxes.get(rxn_id, 'N/A')}")
+
+    # --- 8. COBRApy Mass and Charge and Elemental Balance Checks ---
+    print("\n--- COBRApy Mass and Charge and Elemental Balance Checks ---")
+    check_mass_balances(model)
@@ -16,9 +16,19 @@
 # You can install it by running: pip install matplotlib
 # ==============================================================================
 
-import matplotlib.pyplot as plt
+import os
+
+import matplotlib
 import numpy as np
 
+# Headless runs (HEADLESS_PLOTS=1), e.g. scripted sweeps: render with the non-interactive Agg backend
+# and write each plot to a PNG instead of opening a window that blocks until it is closed.
+HEADLESS_PLOTS = os.environ.get("HEADLESS_PLOTS", "").lower() in ("1", "true", "yes")
+if HEADLESS_PLOTS:
+    matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+
 def get_valid_input(prompt, value_type=float, min_val=None, max_val=None):
     """
     Helper function to get and validate user input.
@@ -36,6 +46,59 @@ def get_valid_input(prompt, value_type=float, min_val=None, max_val=None):
         except ValueError:
             print("Invalid input. Please enter a valid number.")
 
+def show_plot(tag):
+    """
+    Shows the current figure, or in headless mode saves it as '<tag>.png' and closes it.
+    """
+    if HEADLESS_PLOTS:
+        plt.savefig(f"{tag}.png", dpi=100)
+        plt.close()
+        print(f"Plot saved to {tag}.png")
+    else:
+        plt.show()
+
+# --- Bioreactor Optimization Model ---
+def bioreactor_compute(volume, substrate_conc, yield_factor, growth_rate, batch_time):
+    """
+    Calculates total biofuel production for one batch and the production curve up to 150%
+    of the batch time. Pure computation: no prompts, printing, or plotting.
+    Returns a dictionary of results for bioreactor_plot.
+    """
+    # Simplified calculation for substrate consumed (using exponential decay model)
+    consumed_substrate = substrate_conc * (1 - np.exp(-growth_rate * batch_time))
+    
+    # Calculate the total biofuel produced
+    total_biofuel = volume * consumed_substrate * yield_factor
+    
+    # Generate data for the plot
+    time_points = np.linspace(0, batch_time * 1.5, 100) # Plot up to 150% of the entered time
+    production_over_time = volume * (substrate_conc * (1 - np.exp(-growth_rate * time_points))) * yield_factor
+    
+    return {
+        'batch_time': batch_time,
+        'total_biofuel': total_biofuel,
+        'time_points': time_points,
+        'production_over_time': production_over_time,
+    }
+
+def bioreactor_plot(results):
+    """
+    Plots production over batch time from the results of bioreactor_compute.
+    """
+    batch_time = results['batch_time']
+    
+    # Create the plot
+    plt.figure(figsize=(10, 6))
+    plt.plot(results['time_points'], results['production_over_time'], label='Biofuel Production')
+    plt.plot(batch_time, results['total_biofuel'], 'ro', label=f'Current Run: {batch_time}h') # Mark the user's specific point
+    plt.title('Bioreactor Production Over Time', fontsize=16)
+    plt.xlabel('Batch Time (h)', fontsize=12)
+    plt.ylabel('Total Biofuel Produced (g)', fontsize=12)
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    show_plot('bioreactor')
+
 def bioreactor_model():
     """
     Runs the Bioreactor Optimization Model with visualization.
@@ -52,34 +115,63 @@ def bioreactor_model():
     growth_rate = get_valid_input("Growth Rate (1/h, e.g., 0.5): ", min_val=0.1)
     batch_time = get_valid_input("Batch Time (h, e.g., 48): ", value_type=int, min_val=1)
     
-    # Simplified calculation for substrate consumed (using exponential decay model)
-    consumed_substrate = substrate_conc * (1 - np.exp(-growth_rate * batch_time))
-    
-    # Calculate the total biofuel produced
-    total_biofuel = volume * consumed_substrate * yield_factor
+    results = bioreactor_compute(volume, substrate_conc, yield_factor, growth_rate, batch_time)
     
     print("\n--- Results ---")
-    print(f"Total Biofuel Produced: {total_biofuel:,.0f} g")
+    print(f"Total Biofuel Produced: {results['total_biofuel']:,.0f} g")
     print("(Note: This is a simplified model for demonstration purposes)")
     
     # --- Data Visualization for Bioreactor Model ---
     print("Generating plot for Bioreactor Production vs. Batch Time...")
+    bioreactor_plot(results)
+
+# --- Technoeconomic Analysis (TEA) Model ---
+def tea_compute(bioreactor_cost, dsp_cost, plant_lifetime, annual_production,
+                annual_substrate_cost, annual_utility_cost, annual_labor_cost):
+    """
+    Calculates annualized CAPEX, total annual cost, and the Minimum Selling Price (MSP),
+    plus MSP over 50%-200% of the annual production. Pure computation: no prompts, printing, or plotting.
+    Returns a dictionary of results for tea_plot.
+    """
+    # Calculate annualized CAPEX
+    annualized_capex = (bioreactor_cost + dsp_cost) / plant_lifetime
     
+    # Calculate total annual cost
+    total_annual_cost = annualized_capex + annual_substrate_cost + annual_utility_cost + annual_labor_cost
+    
+    # Calculate Minimum Selling Price (MSP)
+    msp = total_annual_cost / annual_production
+
     # Generate data for the plot
-    time_points = np.linspace(0, batch_time * 1.5, 100) # Plot up to 150% of the entered time
-    production_over_time = volume * (substrate_conc * (1 - np.exp(-growth_rate * time_points))) * yield_factor
+    production_points = np.linspace(annual_production * 0.5, annual_production * 2, 100)
+    msp_over_production = total_annual_cost / production_points
+    
+    return {
+        'annual_production': annual_production,
+        'annualized_capex': annualized_capex,
+        'total_annual_cost': total_annual_cost,
+        'msp': msp,
+        'production_points': production_points,
+        'msp_over_production': msp_over_production,
+    }
+
+def tea_plot(results):
+    """
+    Plots MSP against annual production from the results of tea_compute.
+    """
+    annual_production = results['annual_production']
     
     # Create the plot
     plt.figure(figsize=(10, 6))
-    plt.plot(time_points, production_over_time, label='Biofuel Production')
-    plt.plot(batch_time, total_biofuel, 'ro', label=f'Current Run: {batch_time}h') # Mark the user's specific point
-    plt.title('Bioreactor Production Over Time', fontsize=16)
-    plt.xlabel('Batch Time (h)', fontsize=12)
-    plt.ylabel('Total Biofuel Produced (g)', fontsize=12)
+    plt.plot(results['production_points'], results['msp_over_production'], label='MSP')
+    plt.plot(annual_production, results['msp'], 'ro', label=f'Current Run: {annual_production:,.0f} g/yr')
+    plt.title('Minimum Selling Price vs. Annual Production', fontsize=16)
+    plt.xlabel('Annual Production (g)', fontsize=12)
+    plt.ylabel('Minimum Selling Price ($ / g)', fontsize=12)
     plt.grid(True)
     plt.legend()
     plt.tight_layout()
-    plt.show()
+    show_plot('tea')
 
 def tea_model():
     """
@@ -96,9 +188,6 @@ def tea_model():
     dsp_cost = get_valid_input("Downstream Processing Cost ($, e.g., 1500000): ", value_type=int)
     plant_lifetime = get_valid_input("Plant Lifetime (years, e.g., 20): ", value_type=int, min_val=1)
     
-    # Calculate annualized CAPEX
-    annualized_capex = (bioreactor_cost + dsp_cost) / plant_lifetime
-    
     # --- Operating Expenditures (OPEX) ---
     print("\n2. Operating Expenditures (OPEX) - Ongoing costs")
     annual_production = get_valid_input("Annual Biofuel Production (g, e.g., 1000000): ", value_type=int, min_val=1)
@@ -106,35 +195,76 @@ def tea_model():
     annual_utility_cost = get_valid_input("Annual Utility & Chemical Cost ($, e.g., 50000): ", value_type=int)
     annual_labor_cost = get_valid_input("Annual Labor Cost ($, e.g., 200000): ", value_type=int)
     
-    # Calculate total annual cost
-    total_annual_cost = annualized_capex + annual_substrate_cost + annual_utility_cost + annual_labor_cost
-    
-    # Calculate Minimum Selling Price (MSP)
-    msp = total_annual_cost / annual_production
+    results = tea_compute(bioreactor_cost, dsp_cost, plant_lifetime, annual_production,
+                          annual_substrate_cost, annual_utility_cost, annual_labor_cost)
     
     print("\n--- Results ---")
-    print(f"Annualized CAPEX: ${annualized_capex:,.0f}")
-    print(f"Total Annual Cost: ${total_annual_cost:,.0f}")
-    print(f"Minimum Selling Price (MSP): ${msp:,.4f} / g")
+    print(f"Annualized CAPEX: ${results['annualized_capex']:,.0f}")
+    print(f"Total Annual Cost: ${results['total_annual_cost']:,.0f}")
+    print(f"Minimum Selling Price (MSP): ${results['msp']:,.4f} / g")
 
     # --- Data Visualization for TEA Model ---
     print("Generating plot for MSP vs. Annual Production...")
+    tea_plot(results)
 
-    # Generate data for the plot
-    production_points = np.linspace(annual_production * 0.5, annual_production * 2, 100)
-    msp_over_production = total_annual_cost / production_points
+# --- Sensitivity Analysis ---
+def sensitivity_compute(bioreactor_cost, dsp_cost, plant_lifetime, base_production, base_substrate_cost,
+                        base_yield, annual_utility_cost, annual_labor_cost,
+                        sub_cost_min, sub_cost_max, yield_min, yield_max):
+    """
+    Calculates MSP across the substrate cost range and across the product yield range.
+    Pure computation: no prompts, printing, or plotting. Returns a dictionary of results for sensitivity_plot.
+    """
+    annualized_capex = (bioreactor_cost + dsp_cost) / plant_lifetime
+
+    # Costs that do not vary in either sweep; folded into one scalar so each sweep is a single array pass
+    fixed_annual_cost = annualized_capex + annual_utility_cost + annual_labor_cost
+
+    # --- Varying Substrate Cost ---
+    # Create a range of annual substrate costs based on user input
+    substrate_costs = np.linspace(sub_cost_min, sub_cost_max, 50)
+    msp_vs_substrate = np.add(substrate_costs, fixed_annual_cost)
+    np.divide(msp_vs_substrate, base_production, out=msp_vs_substrate)
     
-    # Create the plot
-    plt.figure(figsize=(10, 6))
-    plt.plot(production_points, msp_over_production, label='MSP')
-    plt.plot(annual_production, msp, 'ro', label=f'Current Run: {annual_production:,.0f} g/yr')
-    plt.title('Minimum Selling Price vs. Annual Production', fontsize=16)
-    plt.xlabel('Annual Production (g)', fontsize=12)
-    plt.ylabel('Minimum Selling Price ($ / g)', fontsize=12)
+    # --- Varying Product Yield ---
+    # Vary the yield factor; annual production scales as base_production * (yield / base_yield)
+    yield_factors = np.linspace(yield_min, yield_max, 50) # g product / g substrate
+    
+    # Calculate the MSP for each yield, assuming a base substrate cost. Dividing the total annual
+    # cost by the scaled production is the same as dividing one scalar by the yield factors.
+    total_annual_cost_for_yield = fixed_annual_cost + base_substrate_cost
+    msp_vs_yield = np.divide(total_annual_cost_for_yield * base_yield / base_production, yield_factors)
+
+    return {
+        'substrate_costs': substrate_costs,
+        'msp_vs_substrate': msp_vs_substrate,
+        'yield_factors': yield_factors,
+        'msp_vs_yield': msp_vs_yield,
+    }
+
+def sensitivity_plot(results):
+    """
+    Plots MSP vs. substrate cost and MSP vs. product yield on twin x-axes from the results of sensitivity_compute.
+    """
+    plt.figure(figsize=(12, 8))
+    
+    # Plot MSP vs. Substrate Cost on the main axes and store the line object
+    line1, = plt.plot(results['substrate_costs'], results['msp_vs_substrate'], 'b-', label='MSP vs. Substrate Cost')
+    plt.title('Sensitivity Analysis: Minimum Selling Price (MSP)', fontsize=16)
+    plt.xlabel('Annual Cost ($)', fontsize=12)
+    plt.ylabel('MSP ($ / g)', fontsize=12)
     plt.grid(True)
-    plt.legend()
+    
+    # Create a secondary x-axis and plot MSP vs. Product Yield, storing its line object
+    ax2 = plt.twiny()
+    ax2.set_xlabel('Product Yield (g/g)', color='r', fontsize=12)
+    line2, = ax2.plot(results['yield_factors'], results['msp_vs_yield'], 'r--', label='MSP vs. Product Yield')
+    
+    # Create a single legend that includes both lines
+    plt.legend(handles=[line1, line2], loc='upper right')
+
     plt.tight_layout()
-    plt.show()
+    show_plot('sensitivity')
 
 def sensitivity_analysis():
     """
@@ -163,44 +293,13 @@ def sensitivity_analysis():
     yield_min = get_valid_input("Minimum Product Yield (g/g, e.g., 0.1): ", min_val=0.01)
     yield_max = get_valid_input("Maximum Product Yield (g/g, e.g., 0.4): ", min_val=yield_min)
     
-    annualized_capex = (bioreactor_cost + dsp_cost) / plant_lifetime
-
-    # --- Varying Substrate Cost ---
-    # Create a range of annual substrate costs based on user input
-    substrate_costs = np.linspace(sub_cost_min, sub_cost_max, 50)
-    msp_vs_substrate = (annualized_capex + substrate_costs + annual_utility_cost + annual_labor_cost) / base_production
-    
-    # --- Varying Product Yield ---
-    # Vary the yield factor and calculate the corresponding annual production
-    yield_factors = np.linspace(yield_min, yield_max, 50) # g product / g substrate
-    production_from_yield = base_production * (yield_factors / base_yield)
-    
-    # Calculate the MSP for each production value, assuming a base substrate cost
-    total_annual_cost_for_yield = annualized_capex + base_substrate_cost + annual_utility_cost + annual_labor_cost
-    msp_vs_yield = total_annual_cost_for_yield / production_from_yield
+    results = sensitivity_compute(bioreactor_cost, dsp_cost, plant_lifetime, base_production, base_substrate_cost,
+                                  base_yield, annual_utility_cost, annual_labor_cost,
+                                  sub_cost_min, sub_cost_max, yield_min, yield_max)
 
     # --- Data Visualization for Sensitivity Analysis ---
     print("Generating sensitivity analysis plot...")
-
-    plt.figure(figsize=(12, 8))
-    
-    # Plot MSP vs. Substrate Cost on the main axes and store the line object
-    line1, = plt.plot(substrate_costs, msp_vs_substrate, 'b-', label='MSP vs. Substrate Cost')
-    plt.title('Sensitivity Analysis: Minimum Selling Price (MSP)', fontsize=16)
-    plt.xlabel('Annual Cost ($)', fontsize=12)
-    plt.ylabel('MSP ($ / g)', fontsize=12)
-    plt.grid(True)
-    
-    # Create a secondary x-axis and plot MSP vs. Product Yield, storing its line object
-    ax2 = plt.twiny()
-    ax2.set_xlabel('Product Yield (g/g)', color='r', fontsize=12)
-    line2, = ax2.plot(yield_factors, msp_vs_yield, 'r--', label='MSP vs. Product Yield')
-    
-    # Create a single legend that includes both lines
-    plt.legend(handles=[line1, line2], loc='upper right')
-
-    plt.tight_layout()
-    plt.show()
+    sensitivity_plot(results)
 
 def main():
     """